@@ -7,17 +7,32 @@ Each tool corresponds to a battle-tested Git script with enhanced safety feature
 """
 
 import asyncio
+import contextlib
+import datetime
+import functools
+import heapq
 import json
 import logging
+import os
+import shutil
+import signal
 import subprocess
 import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import CallToolResult, TextContent, Tool
 
+try:
+    import pygit2
+except ImportError:  # Optional: enables in-process fast paths for read-only tools
+    pygit2 = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("git-scripts-mcp")
@@ -25,6 +40,662 @@ logger = logging.getLogger("git-scripts-mcp")
 # Find the git scripts directory (parent of mcp-server)
 SCRIPT_DIR = Path(__file__).parent.parent.parent.absolute()
 
+# Commits listed per side by git_branch_diff
+BRANCH_DIFF_MAX_COMMITS = 20
+
+# Tools that only read repository state and may run concurrently in git_batch
+READ_ONLY_TOOLS = frozenset({
+    "git_check_dup",
+    "git_branch_diff",
+    "git_find_file",
+    "git_diff_patch",
+})
+
+# Read-only tools whose results are briefly reused for identical calls
+CACHED_TOOLS = frozenset({"git_check_dup", "git_branch_diff", "git_find_file"})
+
+# Tools that rewrite history; running one drops every cached result
+MUTATING_TOOLS = frozenset({"git_undo", "git_redo", "git_recommit", "git_dedupe"})
+
+# Scripts warmed at startup because clients call them most
+HOT_SCRIPTS = ("git-undo", "git-redo", "git-check-dup")
+
+# Upper bound on git/script processes running at once (FD and process limits)
+MAX_CONCURRENT_COMMANDS = os.cpu_count() or 8
+
+# 'git cat-file' mode kept running by _GitWorker
+CAT_FILE_CHECK = "--batch-check=%(objectname) %(objecttype)"
+
+# Seconds a cached read-only tool result stays valid
+OUTPUT_CACHE_TTL = 5.0
+
+# Seconds a child gets to exit after SIGTERM before it is killed
+TERMINATE_TIMEOUT = 2.0
+
+# cat-file workers unused for IDLE_TIMEOUT seconds are stopped; checked every
+# IDLE_CHECK_INTERVAL seconds
+IDLE_TIMEOUT = 300.0
+IDLE_CHECK_INTERVAL = 30.0
+
+# Entries kept by the in-memory result caches
+RESULT_CACHE_SIZE = 256
+
+# Absolute git path: subprocess only uses the cheaper posix_spawn() when the
+# executable is given with a directory component
+GIT = shutil.which("git") or "git"
+
+# Child environment: never let git block on a terminal credential prompt
+SUBPROCESS_ENV = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+
+# Patch-ids computed in-process, kept under the repository's .git directory.
+# Bump the version whenever _patch_id changes what it returns for a commit,
+# so files written by older versions are discarded rather than trusted.
+PATCH_ID_CACHE_FILE = "mcp-patch-id-cache"
+PATCH_ID_CACHE_HEADER = "# git-scripts-mcp patch-id cache v2\n"
+
+# Bytes requested per read when draining a subprocess pipe
+READ_CHUNK_SIZE = 1 << 16
+
+# Answer fed to scripts' confirmation prompts when a tool is called with confirm
+CONFIRM_YES = b"y\n"
+
+# Stdout kept from scripts that can list a whole repository's history; the
+# script is stopped once it writes more than this
+SCRIPT_OUTPUT_MAX_BYTES = 2 << 20
+
+# Tool output longer than twice this many characters keeps only its head and tail
+OUTPUT_CLIP_CHARS = 64 * 1024
+
+
+class _CmdResult(NamedTuple):
+    """Outcome of a finished subprocess."""
+
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+class _ScriptToolSpec(NamedTuple):
+    """A tool that runs one Git script with arguments mapped onto its command line."""
+
+    script: str
+    label: str
+    # (argument name, command-line flag) pairs appended when the argument is true
+    flags: Tuple[Tuple[str, str], ...] = ()
+    # Required arguments passed positionally, before any flags
+    positional: Tuple[str, ...] = ()
+    # Title for successful output; defaults to "✅ <label> completed successfully:"
+    success_title: Optional[str] = None
+    # Stop the script once its stdout exceeds this many bytes (None: no cap)
+    max_bytes: Optional[int] = None
+    # Safe to terminate if the call is cancelled (see READ_ONLY_TOOLS)
+    read_only: bool = False
+
+
+# Tools that need nothing beyond argument mapping and optional auto-confirm
+SCRIPT_TOOLS: Dict[str, _ScriptToolSpec] = {
+    "git_undo": _ScriptToolSpec("git-undo", "Git undo"),
+    "git_redo": _ScriptToolSpec(
+        "git-redo", "Git redo", flags=(("message_only", "--message-only"),),
+    ),
+    "git_recommit": _ScriptToolSpec("git-recommit", "Git recommit"),
+    "git_find_file": _ScriptToolSpec(
+        "git-find_file", "Git find file",
+        flags=(("local", "--local"), ("history", "--history"), ("deleted", "--deleted")),
+        positional=("pattern",),
+        success_title="🔎 Git find file results:",
+        max_bytes=SCRIPT_OUTPUT_MAX_BYTES,
+        read_only=True,
+    ),
+}
+
+
+class _LRUCache:
+    """Small bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int = RESULT_CACHE_SIZE):
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._maxsize = maxsize
+
+    def get(self, key: Any) -> Any:
+        """Return the cached value for key, or None."""
+        if key not in self._data:
+            return None
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def put(self, key: Any, value: Any) -> None:
+        """Store value under key, evicting the oldest entry if full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._data.clear()
+
+
+class _OutputCache(_LRUCache):
+    """LRU cache whose entries also expire after a fixed time-to-live."""
+
+    def __init__(self, ttl: float = OUTPUT_CACHE_TTL, maxsize: int = RESULT_CACHE_SIZE):
+        super().__init__(maxsize)
+        self._ttl = ttl
+
+    def get(self, key: Any) -> Any:
+        """Return the cached value for key, or None if absent or expired."""
+        entry = super().get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        return value if time.monotonic() < expires else None
+
+    def put(self, key: Any, value: Any) -> None:
+        """Store value under key until the TTL runs out."""
+        super().put(key, (time.monotonic() + self._ttl, value))
+
+
+class _ToolGate:
+    """Readers-writer gate for tool calls.
+
+    Read-only tools hold it shared and overlap freely; any other tool waits for
+    in-flight reads to drain and then runs alone. Waiting writers hold back new
+    readers so a steady stream of reads cannot starve them.
+    """
+
+    def __init__(self) -> None:
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            self._cond = asyncio.Condition()
+            self._loop = loop
+        return self._cond
+
+    @contextlib.asynccontextmanager
+    async def shared(self):
+        """Hold the gate alongside other readers."""
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(lambda: not self._writing and not self._writers_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with cond:
+                self._readers -= 1
+                cond.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def exclusive(self):
+        """Hold the gate alone."""
+        cond = self._condition()
+        async with cond:
+            self._writers_waiting += 1
+            try:
+                await cond.wait_for(lambda: not self._writing and not self._readers)
+            finally:
+                self._writers_waiting -= 1
+                cond.notify_all()
+            self._writing = True
+        try:
+            yield
+        finally:
+            async with cond:
+                self._writing = False
+                cond.notify_all()
+
+
+def _clip(text: str) -> str:
+    """Keep the first and last OUTPUT_CLIP_CHARS characters of oversized output."""
+    if len(text) <= 2 * OUTPUT_CLIP_CHARS:
+        return text
+    omitted = len(text) - 2 * OUTPUT_CLIP_CHARS
+    return "".join((
+        text[:OUTPUT_CLIP_CHARS],
+        f"\n\n... [{omitted} characters truncated] ...\n\n",
+        text[-OUTPUT_CLIP_CHARS:],
+    ))
+
+
+async def _read_stream(
+    stream: asyncio.StreamReader,
+    max_bytes: Optional[int] = None,
+    on_overflow=None,
+) -> bytearray:
+    """Drain a subprocess pipe chunk by chunk into one growable buffer.
+
+    With max_bytes, keeps at most that much, calls on_overflow() once when the
+    limit is first exceeded and discards the rest until the pipe closes.
+    """
+    buf = bytearray()
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return buf
+        if max_bytes is None:
+            buf += chunk
+        elif len(buf) <= max_bytes:
+            buf += chunk
+            if len(buf) > max_bytes:
+                del buf[max_bytes + 1:]
+                if on_overflow is not None:
+                    on_overflow()
+
+
+async def _feed_stdin(stream: asyncio.StreamWriter, data: bytes) -> None:
+    """Write data to a subprocess stdin and close it."""
+    try:
+        stream.write(data)
+        await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        # The child exited without reading its input
+        pass
+    stream.close()
+
+
+def _patch_id(repo: "pygit2.Repository", oid: str) -> Optional[str]:
+    """Compute a commit's stable patch-id in-process (as 'git patch-id --stable').
+
+    Returns "" for commits without changes and None where libgit2 would hash
+    something other than what 'git show' prints: merge commits (combined
+    diffs), renames, binary changes and empty files added or deleted.
+    """
+    commit = repo[oid]
+    if len(commit.parents) > 1:
+        return None
+    if commit.parents:
+        diff = repo.diff(commit.parents[0], commit)
+    else:
+        diff = commit.tree.diff_to_tree(swap=True)
+    if not len(diff):
+        return ""
+    # Detect renames as 'git show' does (diff.renames) before judging the diff
+    diff.find_similar()
+    for patch in diff:
+        delta = patch.delta
+        if delta.is_binary or delta.status in (pygit2.GIT_DELTA_RENAMED, pygit2.GIT_DELTA_COPIED):
+            return None
+        if delta.status in (pygit2.GIT_DELTA_ADDED, pygit2.GIT_DELTA_DELETED) and not patch.hunks:
+            return None
+    return str(diff.patchid)
+
+
+def _subject(message: str) -> str:
+    """A commit message's first paragraph on one line, as git's %s prints it."""
+    lines: List[str] = []
+    for line in message.split("\n"):
+        line = line.rstrip()
+        if line:
+            lines.append(line)
+        elif lines:
+            break
+    return " ".join(lines)
+
+
+def _short_date(signature: "pygit2.Signature") -> str:
+    """A signature's date in its own timezone, as git's --date=short prints it."""
+    tz = datetime.timezone(datetime.timedelta(minutes=signature.offset))
+    return datetime.datetime.fromtimestamp(signature.time, tz).strftime("%Y-%m-%d")
+
+
+class _PatchIdStore:
+    """Patch-ids by commit id, persisted to a file under .git once loaded.
+
+    A commit's patch-id never changes, so entries only go stale when
+    _patch_id does; a file without the current PATCH_ID_CACHE_HEADER is
+    ignored and rewritten. Only used from the pygit2 worker thread.
+    """
+
+    # Saved in place of the (empty) patch-id of a commit without changes, so
+    # a line cut off after the commit id can't be mistaken for one
+    EMPTY = "-"
+
+    def __init__(self) -> None:
+        self._path: Optional[Path] = None
+        self._ids: Dict[str, str] = {}
+        self._new: List[str] = []
+        self._rewrite = True
+
+    def load(self, path: Path) -> None:
+        """Read previously saved patch-ids and save new ones to path."""
+        self._path = path
+        self._rewrite = True
+        try:
+            with path.open(encoding="ascii") as f:
+                if f.readline() != PATCH_ID_CACHE_HEADER:
+                    return
+                self._rewrite = False
+                for line in f:
+                    oid, _, patch_id = line.rstrip("\n").partition(" ")
+                    # Skip anything torn by a concurrent writer
+                    if patch_id == self.EMPTY:
+                        self._ids[oid] = ""
+                    elif len(patch_id) == len(oid):
+                        self._ids[oid] = patch_id
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, repo: "pygit2.Repository", oid: str) -> Optional[str]:
+        """Return the commit's patch-id, computing it on first use (see _patch_id)."""
+        patch_id = self._ids.get(oid)
+        if patch_id is None:
+            patch_id = _patch_id(repo, oid)
+            if patch_id is None:
+                return None
+            self._ids[oid] = patch_id
+            self._new.append(f"{oid} {patch_id or self.EMPTY}\n")
+        return patch_id
+
+    def flush(self) -> None:
+        """Append patch-ids computed since the last flush to the file."""
+        if not self._new or self._path is None:
+            return
+        try:
+            with self._path.open("w" if self._rewrite else "a", encoding="ascii") as f:
+                if self._rewrite:
+                    f.write(PATCH_ID_CACHE_HEADER)
+                    self._rewrite = False
+                f.writelines(self._new)
+        except OSError:
+            logger.debug("Could not update %s", self._path)
+        self._new.clear()
+
+
+def _check_dup_report(
+    repo: "pygit2.Repository",
+    patch_ids: _PatchIdStore,
+    remote_branch: str,
+    quiet: bool,
+) -> Optional[str]:
+    """Produce git-check-dup's output in-process.
+
+    Pairs commits on HEAD and remote_branch (since their merge base) whose
+    patch-ids match, in the script's order and format. Returns None when a
+    revision can't be resolved or a commit's patch-id can't be reproduced, so
+    the caller can run the script instead.
+    """
+    try:
+        head, remote = (
+            repo.revparse_single(rev).peel(pygit2.Commit).id
+            for rev in ("HEAD", remote_branch)
+        )
+    except (KeyError, ValueError, pygit2.GitError):
+        return None
+    base = repo.merge_base(head, remote) or remote
+
+    sides: List[Dict[str, List[str]]] = []
+    for tip in (head, remote):
+        by_patch_id: Dict[str, List[str]] = {}
+        walker = repo.walk(tip)
+        walker.hide(base)
+        for commit in walker:
+            oid = str(commit.id)
+            patch_id = patch_ids.lookup(repo, oid)
+            if patch_id is None:
+                return None
+            # 'git patch-id' prints nothing for empty commits: they never match
+            if patch_id:
+                by_patch_id.setdefault(patch_id, []).append(oid)
+        sides.append(by_patch_id)
+    local, upstream = sides
+
+    # join(1) over sorted "patch_id hash" lines: by patch-id, then by hash
+    lines: List[str] = []
+    for patch_id in sorted(local.keys() & upstream.keys()):
+        for local_oid in sorted(local[patch_id]):
+            for remote_oid in sorted(upstream[patch_id]):
+                if quiet:
+                    lines.append(f"{local_oid} {remote_oid} {patch_id}\n")
+                    continue
+                lines.append(f"{'Local':<40} {f'Remote({remote_branch})':<40} Patch_id\n")
+                lines.append(f"{local_oid:<40} {remote_oid:<40} {patch_id}\n")
+                for oid in (local_oid, remote_oid):
+                    commit = repo[oid]
+                    lines.append(
+                        f"    {oid[:8]}: {_short_date(commit.author)} {_subject(commit.message)}\n"
+                    )
+    return "".join(lines)
+
+
+def _abbrev_length(repo: "pygit2.Repository") -> int:
+    """The shortest object id abbreviation git would use in this repository.
+
+    Follows core.abbrev; when it is unset or "auto", estimates the length
+    from the packed object count as git does (half the bits needed to count
+    them, rounded up, and at least 7).
+    """
+    value = repo.config["core.abbrev"].lower() if "core.abbrev" in repo.config else "auto"
+    if value in ("false", "no", "off"):
+        return 64  # Never abbreviate
+    if value.isdigit():
+        return max(int(value), 4)
+
+    # Linked worktrees keep their objects in the main repository
+    git_dir = Path(repo.path)
+    commondir = git_dir / "commondir"
+    if commondir.is_file():
+        git_dir = git_dir / commondir.read_text().strip()
+
+    count = 0
+    for index in (git_dir / "objects" / "pack").glob("*.idx"):
+        # The last fan-out entry holds the pack's object count; version 2+
+        # indexes put it after an 8-byte header
+        with index.open("rb") as f:
+            header = f.read(8 + 256 * 4)
+        fanout = header[8:] if header.startswith(b"\377tOc") else header
+        count += int.from_bytes(fanout[255 * 4:256 * 4], "big")
+    return max(7, (count.bit_length() + 1) // 2)
+
+
+def _abbreviate(repo: "pygit2.Repository", oid: str, length: int) -> str:
+    """Abbreviate oid to at least length digits, lengthening it until unique."""
+    while length < len(oid):
+        try:
+            repo.get(oid[:length])
+        except ValueError:
+            # Ambiguous prefix
+            length += 1
+        else:
+            break
+    return oid[:length]
+
+
+def _branch_logs(
+    repo: "pygit2.Repository", branch1: str, branch2: str,
+) -> Optional[Tuple[List[str], List[str]]]:
+    """List '<short id> <subject>' lines unique to each side, newest first.
+
+    Mirrors 'git log --oneline branch2..branch1' and 'branch1..branch2',
+    capped at BRANCH_DIFF_MAX_COMMITS per side. Returns None for revisions
+    libgit2 can't resolve so the caller can let git report the error.
+    """
+    try:
+        tips = [repo.revparse_single(rev).peel(pygit2.Commit).id for rev in (branch1, branch2)]
+    except (KeyError, ValueError, pygit2.GitError):
+        return None
+
+    abbrev = _abbrev_length(repo)
+    sides = []
+    for tip, other in (tips, tips[::-1]):
+        walker = repo.walk(tip)
+        walker.hide(other)
+        unique = {commit.id: commit for commit in walker}
+
+        # git's own order: newest commit date first, ties in the order queued.
+        # Neither libgit2 sort matches it once commits share a timestamp.
+        queue = [(-unique[tip].commit_time, 0, tip)] if tip in unique else []
+        queued = {tip}
+        lines = []
+        while queue and len(lines) < BRANCH_DIFF_MAX_COMMITS:
+            commit = unique[heapq.heappop(queue)[2]]
+            short_id = _abbreviate(repo, str(commit.id), abbrev)
+            lines.append(f"{short_id} {_subject(commit.message)}\n")
+            for parent_id in commit.parent_ids:
+                if parent_id in unique and parent_id not in queued:
+                    queued.add(parent_id)
+                    heapq.heappush(queue, (-unique[parent_id].commit_time, len(queued), parent_id))
+        sides.append(lines)
+    return sides[0], sides[1]
+
+
+def _signal_group(process: asyncio.subprocess.Process, sig: int) -> bool:
+    """Signal a child started in its own session and everything it spawned.
+
+    Returns False if none of them is left.
+    """
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+async def _terminate(process: asyncio.subprocess.Process) -> None:
+    """Stop a child's process group, escalating to SIGKILL if it ignores SIGTERM.
+
+    The child must have been started with start_new_session=True.
+    """
+    if not _signal_group(process, signal.SIGTERM):
+        return
+    try:
+        await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _signal_group(process, signal.SIGKILL)
+        await process.wait()
+
+
+class _GitWorker:
+    """A persistent 'git cat-file --batch-check' answering lookups for one repo.
+
+    The child starts on first use and handles one request at a time under
+    its lock.
+    """
+
+    def __init__(self) -> None:
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.last_used = 0.0
+
+    async def check(self, rev: str) -> Optional[Tuple[str, str]]:
+        """Return (oid, type) for rev, or None if it does not exist."""
+        if "\n" in rev:
+            return None
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Pipes and locks from a previous event loop are unusable
+            self._process = None
+            self._lock = asyncio.Lock()
+            self._loop = loop
+
+        async with self._lock:
+            self.last_used = loop.time()
+            process = self._process
+            if process is None or process.returncode is not None:
+                process = self._process = await asyncio.create_subprocess_exec(
+                    GIT, "cat-file", CAT_FILE_CHECK,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                    env=SUBPROCESS_ENV,
+                    close_fds=False,
+                )
+
+            try:
+                process.stdin.write(rev.encode() + b"\n")
+                await process.stdin.drain()
+                header = await process.stdout.readline()
+                if not header:
+                    raise asyncio.IncompleteReadError(header, None)
+            except (OSError, asyncio.IncompleteReadError, asyncio.CancelledError):
+                # A reply left unread (e.g. the caller was cancelled) would be
+                # taken as the answer to the next request: start afresh
+                await self._stop()
+                raise
+
+        fields = header.split()
+        if fields[-1] in (b"missing", b"ambiguous"):
+            return None
+        oid, obj_type = fields
+        return oid.decode(), obj_type.decode()
+
+    async def close(self) -> None:
+        """Stop the cat-file child."""
+        await self._stop()
+
+    async def stop_if_idle(self, now: float) -> bool:
+        """Stop the child if unused for IDLE_TIMEOUT seconds before now.
+
+        Leaves it alone while a request holds (or waits for) the lock.
+        Returns whether it was stopped.
+        """
+        lock = self._lock
+        if (
+            self._process is None
+            or lock is None
+            or lock.locked()
+            or self._loop is not asyncio.get_running_loop()
+        ):
+            return False
+        async with lock:
+            if now - self.last_used <= IDLE_TIMEOUT:
+                return False
+            await self._stop()
+        return True
+
+    async def _stop(self) -> None:
+        """Close the child's stdin so it exits, killing it if it lingers."""
+        process, self._process = self._process, None
+        if process is None or process.returncode is not None:
+            return
+        process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+
+# One cat-file worker per repository (keyed by working directory)
+_GIT_WORKERS: Dict[str, _GitWorker] = {}
+
+
+def _git_worker() -> _GitWorker:
+    """Return the cat-file worker for the current working directory."""
+    cwd = os.getcwd()
+    worker = _GIT_WORKERS.get(cwd)
+    if worker is None:
+        worker = _GIT_WORKERS[cwd] = _GitWorker()
+    return worker
+
+
+async def _close_idle_workers(now: float) -> None:
+    """Stop the children of workers last used more than IDLE_TIMEOUT seconds before now.
+
+    Workers stay registered; their next lookup starts a fresh child.
+    """
+    for cwd, worker in list(_GIT_WORKERS.items()):
+        if await worker.stop_if_idle(now):
+            logger.debug("Stopped idle cat-file worker for %s", cwd)
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_script(script_name: str) -> Path:
+    """Resolve a Git script path once; the scripts don't move while serving."""
+    script_path = SCRIPT_DIR / script_name
+    if not script_path.exists():
+        msg = f"Script not found: {script_path}"
+        raise FileNotFoundError(msg)
+    return script_path
+
 
 class GitScriptsMCP:
     """MCP server for Git Scripts collection with improved dispatch pattern."""
@@ -33,18 +704,45 @@ class GitScriptsMCP:
         self.server = Server("git-scripts-mcp")
         self.setup_tools()
 
+        # Tool definitions are static; build them once rather than per listing
+        self._tools = self._build_tools()
+
+        # In-process repository handle (pygit2 only); libgit2 objects aren't
+        # safe to share across threads, so all access goes through one worker
+        self._repo: Optional["pygit2.Repository"] = None
+        self._repo_executor: Optional[ThreadPoolExecutor] = None
+        self._patch_ids = _PatchIdStore()
+
+        # git_diff_patch results keyed by the names *and* resolved commit ids;
+        # commits are immutable, so entries never go stale
+        self._diff_patch_cache = _LRUCache()
+
+        # git_check_dup output keyed by branch tips; same reasoning as above
+        self._check_dup_cache = _LRUCache()
+
+        # Recent CACHED_TOOLS results keyed by (tool, arguments, HEAD)
+        self._output_cache = _OutputCache()
+        self._in_flight: Dict[Any, "asyncio.Future[CallToolResult]"] = {}
+
+        # Read-only tools overlap; everything else runs alone
+        self._gate = _ToolGate()
+
+        # Created lazily so it binds to the running loop (Python < 3.10)
+        self._command_slots: Optional[asyncio.Semaphore] = None
+
         # Tool handler registry - cleaner than if/elif chain
         self.handlers = {
-            "git_undo": self._handle_git_undo,
-            "git_redo": self._handle_git_redo,
-            "git_recommit": self._handle_git_recommit,
+            **{
+                name: functools.partial(self._handle_script_tool, spec)
+                for name, spec in SCRIPT_TOOLS.items()
+            },
             "git_check_dup": self._handle_git_check_dup,
             "git_dedupe": self._handle_git_dedupe,
             "git_branch_diff": self._handle_git_branch_diff,
-            "git_find_file": self._handle_git_find_file,
             "git_diff_patch": self._handle_git_diff_patch,
             "git_extract_conflict_files": self._handle_git_extract_conflict_files,
             "git_remerge_from_files": self._handle_git_remerge_from_files,
+            "git_batch": self._handle_git_batch,
         }
 
     def setup_tools(self):
@@ -54,6 +752,10 @@ class GitScriptsMCP:
 
     async def list_tools(self) -> List[Tool]:
         """List all available Git script tools with safety focus."""
+        return self._tools
+
+    def _build_tools(self) -> List[Tool]:
+        """Build the Git script tool definitions."""
         return [
             Tool(
                 name="git_undo",
@@ -327,6 +1029,42 @@ class GitScriptsMCP:
                     "required": ["file", "ours_path", "base_path", "theirs_path"],
                 },
             ),
+
+            Tool(
+                name="git_batch",
+                description=(
+                    """⚡ Run several read-only Git tools concurrently in a single call.
+                    Supports git_check_dup, git_branch_diff, git_find_file and git_diff_patch.
+                    Results are returned in the order the calls were given.
+
+                    📋 USE WHEN: Need answers from several independent read-only queries
+                    (e.g. duplicate check plus branch comparison) and want them at once."""
+                ),
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "calls": {
+                            "type": "array",
+                            "description": "Tool invocations to run concurrently",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "name": {
+                                        "type": "string",
+                                        "enum": sorted(READ_ONLY_TOOLS),
+                                    },
+                                    "arguments": {
+                                        "type": "object",
+                                        "default": {},
+                                    },
+                                },
+                                "required": ["name"],
+                            },
+                        },
+                    },
+                    "required": ["calls"],
+                },
+            ),
         ]
 
     async def call_tool(self, name: str, arguments: Dict[str, Any]) -> CallToolResult:
@@ -339,130 +1077,274 @@ class GitScriptsMCP:
                     isError=True,
                 )
 
-            return await handler(arguments)
+            # git_batch only fans out to call_tool, which gates each call itself
+            if name == "git_batch":
+                return await handler(arguments)
+
+            if name in READ_ONLY_TOOLS:
+                async with self._gate.shared():
+                    if name in CACHED_TOOLS:
+                        return await self._call_cached(name, handler, arguments)
+                    return await handler(arguments)
+
+            async with self._gate.exclusive():
+                result = await handler(arguments)
+                if name in MUTATING_TOOLS:
+                    self._output_cache.clear()
+            return result
 
-        except subprocess.CalledProcessError as e:
-            error_msg = f"Git script failed: {e.stderr.decode() if e.stderr else str(e)}"
-            return CallToolResult(
-                content=[TextContent(type="text", text=error_msg)],
-                isError=True,
-            )
         except Exception as e:
-            logger.exception(f"Error executing {name}")
+            logger.exception("Error executing %s", name)
             return CallToolResult(
                 content=[TextContent(type="text", text=f"Tool execution failed: {e!s}")],
                 isError=True,
             )
 
+    async def _call_cached(self, name: str, handler, arguments: Dict[str, Any]) -> CallToolResult:
+        """Run a read-only handler, reusing a recent result for identical input.
+
+        Entries are keyed by the resolved HEAD, expire after OUTPUT_CACHE_TTL
+        (refs other than HEAD may move) and are dropped when a mutating tool runs.
+        Identical calls that arrive while one is still running share its result.
+        """
+        try:
+            head = await self._resolve_commit("HEAD")
+            key = (name, frozenset(arguments.items()), head) if head else None
+        except (OSError, asyncio.IncompleteReadError, TypeError):
+            key = None
+
+        result = self._output_cache.get(key) if key else None
+        if result is not None:
+            return result
+
+        # An identical call is already running: wait for its result
+        pending = self._in_flight.get(key) if key else None
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller that started it was cancelled; run our own
+
+        task = asyncio.ensure_future(handler(arguments))
+        if key:
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        result = await task
+        if key and not result.isError:
+            self._output_cache.put(key, result)
+        return result
+
     def _get_script_path(self, script_name: str) -> Path:
         """Get the full path to a Git script."""
-        script_path = SCRIPT_DIR / script_name
-        if not script_path.exists():
-            msg = f"Script not found: {script_path}"
-            raise FileNotFoundError(msg)
-        return script_path
-
-    async def _run_command(self, cmd: List[str], input_text: Optional[str] = None) -> subprocess.CompletedProcess:
-        """Run a command with proper error handling."""
-        try:
+        return _resolve_script(script_name)
+
+    async def _run_command(
+        self,
+        cmd: List[str],
+        input_bytes: Optional[bytes] = None,
+        max_bytes: Optional[int] = None,
+        terminate_on_cancel: bool = False,
+    ) -> _CmdResult:
+        """Run a command and collect its exit status and output.
+
+        With max_bytes, the command and its children are killed once its stdout
+        grows past that size; the output so far is returned with a truncation
+        marker, as a success unless the command had already failed. If the call
+        is cancelled, the command and its children are terminated when
+        terminate_on_cancel is set (read-only tools); otherwise it runs to
+        completion first, since stopping a script part-way could leave the
+        repository half rewritten. Failures to start the command (e.g. OSError)
+        propagate to call_tool.
+        """
+        if self._command_slots is None:
+            self._command_slots = asyncio.Semaphore(MAX_CONCURRENT_COMMANDS)
+
+        async with self._command_slots:
             process = await asyncio.create_subprocess_exec(
                 *cmd,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                stdin=asyncio.subprocess.PIPE if input_text else None,
-            )
-
-            stdout, stderr = await process.communicate(
-                input=input_text.encode() if input_text else None,
+                # Never inherit stdin: it is the MCP stdio transport
+                stdin=asyncio.subprocess.PIPE if input_bytes else asyncio.subprocess.DEVNULL,
+                env=SUBPROCESS_ENV,
+                # close_fds=True would force fork+exec; our own descriptors are
+                # non-inheritable anyway (PEP 446), so allow posix_spawn()
+                close_fds=False,
+                # A session of its own lets us signal the script's git children
+                # too (at the cost of posix_spawn on older Pythons)
+                start_new_session=terminate_on_cancel or max_bytes is not None,
             )
 
-            return subprocess.CompletedProcess(
-                args=cmd,
-                returncode=process.returncode,
-                stdout=stdout,
-                stderr=stderr,
-            )
-        except Exception as e:
-            raise subprocess.CalledProcessError(1, cmd, str(e).encode(), str(e).encode())
-
-    # Tool handlers using improved naming convention
-    async def _handle_git_undo(self, args: Dict[str, Any]) -> CallToolResult:
-        """Execute git-undo script."""
-        script_path = self._get_script_path("git-undo")
-        cmd = [str(script_path)]
-
-        # Auto-confirm if requested
-        input_text = "y\n" if args.get("confirm") else None
-
-        result = await self._run_command(cmd, input_text)
+            def stop():
+                # Enough output: don't let the command produce (or us keep) more
+                _signal_group(process, signal.SIGKILL)
+
+            # Read both pipes incrementally into bytearrays rather than letting
+            # communicate() collect chunk lists and join them into a second copy
+            readers = [
+                _read_stream(process.stdout, max_bytes, stop),
+                _read_stream(process.stderr),
+                process.wait(),
+            ]
+            if input_bytes:
+                readers.append(_feed_stdin(process.stdin, input_bytes))
+            collect = asyncio.ensure_future(asyncio.gather(*readers))
+            try:
+                stdout, stderr, *_ = await asyncio.shield(collect)
+            except asyncio.CancelledError:
+                if terminate_on_cancel:
+                    # The client gave up on a read-only call; don't leave git running
+                    await _terminate(process)
+                    collect.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await collect
+                else:
+                    # Let a possibly mutating script finish, keeping its command
+                    # slot (and the tool gate) until it has
+                    await asyncio.shield(collect)
+                raise
+
+        returncode = process.returncode
+        if max_bytes is not None and len(stdout) > max_bytes:
+            del stdout[max_bytes:]
+            stdout += f"\n... [output truncated after {max_bytes} bytes] ...\n".encode()
+            if returncode == -signal.SIGKILL:
+                # Our kill ended it, not a failure of its own
+                returncode = 0
+
+        # Decode once here so handlers never re-decode the same buffer
+        return _CmdResult(
+            returncode,
+            stdout.decode("utf-8", "replace"),
+            stderr.decode("utf-8", "replace"),
+        )
 
-        if result.returncode == 0:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=f"✅ Git undo completed successfully:\n\n{result.stdout.decode()}",
-                )],
+    async def _resolve_commit(self, rev: str) -> Optional[str]:
+        """Resolve a revision to a full commit id, or None if it is not a commit.
+
+        Raises OSError/IncompleteReadError if cat-file is unusable here
+        (e.g. not inside a Git repository).
+        """
+        obj = await _git_worker().check(f"{rev}^{{commit}}")
+        return obj[0] if obj else None
+
+    def _open_repo(self) -> Optional["pygit2.Repository"]:
+        """Open the current repository once, or return None without pygit2."""
+        if pygit2 is None:
+            return None
+        if self._repo is None:
+            path = pygit2.discover_repository(os.getcwd())
+            if path is None:
+                return None
+            self._repo = pygit2.Repository(path)
+            self._patch_ids.load(Path(self._repo.path) / PATCH_ID_CACHE_FILE)
+        return self._repo
+
+    async def _in_repo(self, func, *args):
+        """Run func(repo, *args) on the pygit2 worker thread.
+
+        Returns None when pygit2 or a repository is unavailable.
+        """
+        if pygit2 is None:
+            return None
+        if self._repo_executor is None:
+            self._repo_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="git-scripts-pygit2",
             )
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"❌ Git undo failed:\n{result.stderr.decode()}",
-            )],
-            isError=True,
-        )
 
-    async def _handle_git_redo(self, args: Dict[str, Any]) -> CallToolResult:
-        """Execute git-redo script."""
-        script_path = self._get_script_path("git-redo")
-        cmd = [str(script_path)]
+        def call():
+            repo = self._open_repo()
+            if repo is None:
+                return None
+            try:
+                return func(repo, *args)
+            finally:
+                self._patch_ids.flush()
 
-        if args.get("message_only"):
-            cmd.append("--message-only")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._repo_executor, call)
 
-        # Auto-confirm if requested
-        input_text = "y\n" if args.get("confirm") else None
+    async def warm_up(self) -> None:
+        """Start the cat-file worker and resolve HEAD before the first tool call.
 
-        result = await self._run_command(cmd, input_text)
+        Faults in the git binary, the repository's refs/objects and the hot
+        scripts so the first user-visible request doesn't pay the cold-cache cost.
+        """
+        try:
+            await self._resolve_commit("HEAD")
+        except (OSError, asyncio.IncompleteReadError):
+            logger.debug("Skipping git warm-up: cat-file unavailable here")
 
-        if result.returncode == 0:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=f"✅ Git redo completed successfully:\n\n{result.stdout.decode()}",
-                )],
-            )
+        # Resolve the most used scripts and pull them, and the shell that runs
+        # them, into the page cache
+        for script_name in HOT_SCRIPTS:
+            try:
+                self._get_script_path(script_name).read_bytes()
+            except OSError:
+                logger.debug("Skipping warm-up of %s", script_name)
+        bash = shutil.which("bash")
+        if bash:
+            await self._run_command([bash, "-c", ":"])
+
+    async def reap_idle_workers(self) -> None:
+        """Periodically stop cat-file workers that have gone idle; runs until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(IDLE_CHECK_INTERVAL)
+            await _close_idle_workers(loop.time())
+
+    async def close(self) -> None:
+        """Release long-lived helper processes and threads."""
+        worker = _GIT_WORKERS.pop(os.getcwd(), None)
+        if worker is not None:
+            await worker.close()
+        if self._repo_executor is not None:
+            self._repo_executor.shutdown(wait=False)
+            self._repo_executor = None
+
+    # Result builders shared by every handler
+    def _ok(self, title: str, body: Optional[str] = None) -> CallToolResult:
+        """Successful result: title, blank line, then body."""
+        text = title if body is None else "".join((title, "\n\n", _clip(body)))
+        return CallToolResult(content=[TextContent(type="text", text=text)])
+
+    def _err(self, title: str, body: Optional[str] = None) -> CallToolResult:
+        """Error result: title, then body on the following line."""
+        text = title if body is None else "".join((title, "\n", _clip(body)))
         return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"❌ Git redo failed:\n{result.stderr.decode()}",
-            )],
+            content=[TextContent(type="text", text=text)],
             isError=True,
         )
 
-    async def _handle_git_recommit(self, args: Dict[str, Any]) -> CallToolResult:
-        """Execute git-recommit script."""
-        script_path = self._get_script_path("git-recommit")
+    # Tool handlers using improved naming convention
+    async def _handle_script_tool(
+        self,
+        spec: _ScriptToolSpec,
+        args: Dict[str, Any],
+    ) -> CallToolResult:
+        """Execute a Git script described by a _ScriptToolSpec."""
+        script_path = self._get_script_path(spec.script)
         cmd = [str(script_path)]
+        for arg in spec.positional:
+            value = args.get(arg)
+            if not value:
+                return self._err(f"❌ Error: {arg} parameter is required")
+            cmd.append(value)
+        cmd.extend(flag for arg, flag in spec.flags if args.get(arg))
 
         # Auto-confirm if requested
-        input_text = "y\n" if args.get("confirm") else None
+        input_bytes = CONFIRM_YES if args.get("confirm") else None
 
-        result = await self._run_command(cmd, input_text)
+        result = await self._run_command(
+            cmd, input_bytes, max_bytes=spec.max_bytes, terminate_on_cancel=spec.read_only,
+        )
 
         if result.returncode == 0:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=f"✅ Git recommit completed successfully:\n\n{result.stdout.decode()}",
-                )],
-            )
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"❌ Git recommit failed:\n{result.stderr.decode()}",
-            )],
-            isError=True,
-        )
+            title = spec.success_title or f"✅ {spec.label} completed successfully:"
+            return self._ok(title, result.stdout)
+        return self._err(f"❌ {spec.label} failed:", result.stderr)
 
     async def _handle_git_check_dup(self, args: Dict[str, Any]) -> CallToolResult:
         """Execute git-check-dup script."""
@@ -476,30 +1358,36 @@ class GitScriptsMCP:
         if remote_branch != "origin/main":
             cmd.append(remote_branch)
 
-        result = await self._run_command(cmd)
-
-        if result.returncode == 0:
-            output = result.stdout.decode()
-            if output.strip():
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=f"🔍 Duplicate commits found:\n\n{output}",
-                    )],
-                )
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text="✅ No duplicate commits detected.",
-                )],
+        # The report depends only on the two tips, so resolve them (cheaply,
+        # via cat-file) and reuse the previous run when neither has moved
+        try:
+            tips = (
+                await self._resolve_commit("HEAD"),
+                await self._resolve_commit(remote_branch),
             )
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"❌ Git check-dup failed:\n{result.stderr.decode()}",
-            )],
-            isError=True,
-        )
+        except (OSError, asyncio.IncompleteReadError):
+            tips = (None, None)
+        cache_key = (remote_branch, bool(args.get("quiet")), *tips) if all(tips) else None
+
+        output = self._check_dup_cache.get(cache_key) if cache_key else None
+        if output is None:
+            # With pygit2, hash the commits in-process (patch-ids are kept
+            # across runs) instead of the script's 'git show | git patch-id'
+            # pair per commit
+            output = await self._in_repo(
+                _check_dup_report, self._patch_ids, remote_branch, bool(args.get("quiet")),
+            )
+        if output is None:
+            result = await self._run_command(cmd, terminate_on_cancel=True)
+            if result.returncode != 0:
+                return self._err("❌ Git check-dup failed:", result.stderr)
+            output = result.stdout
+        if cache_key:
+            self._check_dup_cache.put(cache_key, output)
+
+        if output.strip():
+            return self._ok("🔍 Duplicate commits found:", output)
+        return self._ok("✅ No duplicate commits detected.")
 
     async def _handle_git_dedupe(
         self,
@@ -513,30 +1401,17 @@ class GitScriptsMCP:
         if onto_branch != "origin/main":
             cmd.extend(["--onto", onto_branch])
 
+        # Only a dry run is safe to cut short; --apply must run to completion
         if args.get("apply"):
             cmd.append("--apply")
-
-        result = await self._run_command(cmd)
+            result = await self._run_command(cmd)
+        else:
+            result = await self._run_command(cmd, max_bytes=SCRIPT_OUTPUT_MAX_BYTES)
 
         if result.returncode == 0:
             mode = "🔧 Applied changes" if args.get("apply") else "🔍 Dry-run analysis"
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=(
-                        f"✅ Git dedupe - {mode}:\n\n{result.stdout.decode()}"
-                    ),
-                )],
-            )
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=(
-                    f"❌ Git dedupe failed:\n{result.stderr.decode()}"
-                ),
-            )],
-            isError=True,
-        )
+            return self._ok(f"✅ Git dedupe - {mode}:", result.stdout)
+        return self._err("❌ Git dedupe failed:", result.stderr)
 
     async def _handle_git_branch_diff(self, args: Dict[str, Any]) -> CallToolResult:
         """Execute git-branch-diff script with text-based comparison."""
@@ -544,83 +1419,37 @@ class GitScriptsMCP:
         branch2 = args.get("branch2", "origin/main")
 
         try:
-            # Get the commit logs for comparison
-            log1_cmd = ["git", "log", "--oneline", "--max-count=20", branch1]
-            log2_cmd = ["git", "log", "--oneline", "--max-count=20", branch2]
-
-            log1_result = await self._run_command(log1_cmd)
-            log2_result = await self._run_command(log2_cmd)
-
-            if log1_result.returncode == 0 and log2_result.returncode == 0:
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=(
-                            f"📊 Branch comparison ({branch1} vs {branch2}):\n\n"
-                            f"=== {branch1} commits ===\n{log1_result.stdout.decode()}\n"
-                            f"=== {branch2} commits ===\n{log2_result.stdout.decode()}\n"
-                            f"💡 Tip: Use 'git log --oneline --graph {branch1} {branch2}' for visual graph"
-                        ),
-                    )],
-                )
-            error_msg = log1_result.stderr.decode() or log2_result.stderr.decode()
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=f"❌ Git branch diff failed:\n{error_msg}",
-                )],
-                isError=True,
-            )
+            # With pygit2, walk both sides in-process instead of spawning git
+            logs = await self._in_repo(_branch_logs, branch1, branch2)
+            if logs is None:
+                # Commits only in branch1, then only in branch2; each log stops
+                # after the per-side cap instead of walking the whole divergence
+                log_cmds = [
+                    [
+                        GIT, "log", "--oneline", f"--max-count={BRANCH_DIFF_MAX_COMMITS}",
+                        f"{other}..{branch}", "--",
+                    ]
+                    for branch, other in ((branch1, branch2), (branch2, branch1))
+                ]
+                results = await asyncio.gather(*(
+                    self._run_command(cmd, terminate_on_cancel=True) for cmd in log_cmds
+                ))
+                for result in results:
+                    if result.returncode != 0:
+                        return self._err("❌ Git branch diff failed:", result.stderr)
+                logs = tuple(result.stdout.splitlines(keepends=True) for result in results)
+
+            left, right = logs
+            # Join every piece once instead of nesting joined logs in an f-string
+            body = "".join((
+                f"=== {branch1} commits ===\n", *left, "\n",
+                f"=== {branch2} commits ===\n", *right, "\n",
+                f"💡 Tip: Use 'git log --oneline --graph {branch1} {branch2}' for visual graph",
+            ))
+            return self._ok(f"📊 Branch comparison ({branch1} vs {branch2}):", body)
 
         except Exception as e:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=f"❌ Git branch diff failed: {e!s}",
-                )],
-                isError=True,
-            )
-
-    async def _handle_git_find_file(self, args: Dict[str, Any]) -> CallToolResult:
-        """Execute git-find_file script."""
-        script_path = self._get_script_path("git-find_file")
-        cmd = [str(script_path)]
-
-        pattern = args.get("pattern")
-        if not pattern:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text="❌ Error: pattern parameter is required",
-                )],
-                isError=True,
-            )
-
-        cmd.append(pattern)
-
-        if args.get("local"):
-            cmd.append("--local")
-        if args.get("history"):
-            cmd.append("--history")
-        if args.get("deleted"):
-            cmd.append("--deleted")
-
-        result = await self._run_command(cmd)
-
-        if result.returncode == 0:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=f"🔎 Git find file results:\n\n{result.stdout.decode()}",
-                )],
-            )
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"❌ Git find file failed:\n{result.stderr.decode()}",
-            )],
-            isError=True,
-        )
+            return self._err(f"❌ Git branch diff failed: {e!s}")
 
     async def _handle_git_diff_patch(self, args: Dict[str, Any]) -> CallToolResult:
         """Execute git-diff-patch script."""
@@ -629,97 +1458,97 @@ class GitScriptsMCP:
         commit2 = args.get("commit2")
 
         if not commit1 or not commit2:
-            return CallToolResult(
-                content=[
-                    TextContent(type="text", text="❌ Error: commit1 and commit2 are required.")
-                ],
-                isError=True,
-            )
+            return self._err("❌ Error: commit1 and commit2 are required.")
 
-        cmd = [str(script_path), commit1, commit2]
-        result = await self._run_command(cmd)
+        # Validate both revisions through the cat-file process instead of
+        # paying for the script (and its git spawns) on a bad reference
+        oids: List[str] = []
+        try:
+            for commit in (commit1, commit2):
+                oid = await self._resolve_commit(commit)
+                if oid is None:
+                    return self._err(
+                        "❌ Git diff-patch failed:",
+                        f"Error: '{commit}' is not a valid commit reference.",
+                    )
+                oids.append(oid)
+        except (OSError, asyncio.IncompleteReadError):
+            logger.debug("cat-file lookup unavailable; deferring to git-diff-patch")
+            oids = []
+
+        cache_key = (commit1, commit2, *oids) if oids else None
+        output = self._diff_patch_cache.get(cache_key) if cache_key else None
+
+        # With pygit2, hash both diffs in-process instead of running
+        # 'git show | git patch-id' twice through the script
+        if output is None and oids:
+            id1 = await self._in_repo(self._patch_ids.lookup, oids[0])
+            id2 = await self._in_repo(self._patch_ids.lookup, oids[1])
+            if id1 is not None and id2 is not None:
+                verdict = "✅ Patches are identical" if id1 == id2 else "❌ Patches differ"
+                output = (
+                    f"Commit {commit1} patch-id: {id1}\n"
+                    f"Commit {commit2} patch-id: {id2}\n"
+                    f"{verdict}\n"
+                )
 
-        if result.returncode == 0:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=f"✅ Patch comparison results:\n\n{result.stdout.decode()}",
-                )],
-            )
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"❌ Git diff-patch failed:\n{result.stderr.decode()}",
-            )],
-            isError=True,
-        )
+        if output is None:
+            cmd = [str(script_path), commit1, commit2]
+            result = await self._run_command(cmd, terminate_on_cancel=True)
+            if result.returncode != 0:
+                return self._err("❌ Git diff-patch failed:", result.stderr)
+            output = result.stdout
+
+        if cache_key:
+            self._diff_patch_cache.put(cache_key, output)
+        return self._ok("✅ Patch comparison results:", output)
 
     async def _handle_git_extract_conflict_files(self, args: Dict[str, Any]) -> CallToolResult:
         """Extract conflict files using git-resolve-conflict --tool-extract."""
         file = args.get("file")
         if not file:
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text="❌ Error: file parameter is required",
-                )],
-                isError=True,
-            )
+            return self._err("❌ Error: file parameter is required")
 
         script_path = self._get_script_path("git-resolve-conflict")
         cmd = [str(script_path), "--tool-extract", file]
 
         result = await self._run_command(cmd)
 
-        logger.info(f"Raw output from git-resolve-conflict: {result.stdout.decode().strip()}")
-        logger.info(f"Stderr from git-resolve-conflict: {result.stderr.decode().strip()}")
-        logger.info(f"Return code from git-resolve-conflict: {result.returncode}")
+        output = result.stdout.strip()
+        logger.info("Raw output from git-resolve-conflict: %s", output)
+        logger.info("Stderr from git-resolve-conflict: %s", result.stderr.strip())
+        logger.info("Return code from git-resolve-conflict: %s", result.returncode)
 
         if result.returncode == 0:
-            output = result.stdout.decode().strip()
             try:
-                import json
                 data = json.loads(output)
-                logger.info(f"Parsed JSON data: {data}")
+                logger.info("Parsed JSON data: %s", data)
                 if "error" in data:
-                    logger.error(f"Error reported by git-resolve-conflict: {data['error']}")
-                    return CallToolResult(
-                        content=[TextContent(type="text", text=f"❌ {data['error']}")],
-                        isError=True,
-                    )
+                    logger.error("Error reported by git-resolve-conflict: %s", data["error"])
+                    return self._err(f"❌ {data['error']}")
                 tmpdir, ours, base, theirs = data["tmpdir"], data["ours"], data["base"], data["theirs"]
-                result_content = TextContent(
-                    type="text",
-                    text=(
-                        f"🔄 Conflict files extracted successfully:\n\n"
-                        f"📁 Temp directory: {tmpdir}\n"
-                        f"📄 Ours file: {ours}\n"
-                        f"📄 Base file: {base}\n"
-                        f"📄 Theirs file: {theirs}\n\n"
-                        f"💡 Edit the 'ours' and/or 'theirs' files as needed, then use git_remerge_from_files to apply changes."
-                    ),
+                final_result = self._ok(
+                    "🔄 Conflict files extracted successfully:",
+                    f"📁 Temp directory: {tmpdir}\n"
+                    f"📄 Ours file: {ours}\n"
+                    f"📄 Base file: {base}\n"
+                    f"📄 Theirs file: {theirs}\n\n"
+                    f"💡 Edit the 'ours' and/or 'theirs' files as needed, then use git_remerge_from_files to apply changes.",
                 )
-                final_result = CallToolResult(content=[result_content])
-                logger.info(f"Returning CallToolResult: {final_result.model_dump_json()}")
+                # Serialising the result is costly; only do it when someone's listening
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Returning CallToolResult: %s", final_result.model_dump_json())
                 return final_result
             except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON output: {output}\nError: {e}")
-                return CallToolResult(
-                    content=[TextContent(
-                        type="text",
-                        text=f"❌ Failed to parse JSON output:\n{output}\nError: {e}",
-                    )],
-                    isError=True,
-                )
+                logger.error("Failed to parse JSON output: %s\nError: %s", output, e)
+                return self._err("❌ Failed to parse JSON output:", f"{output}\nError: {e}")
 
-        logger.error(f"Git extract conflict files failed with return code {result.returncode}:\n{result.stderr.decode()}")
-        return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"❌ Git extract conflict files failed:\n{result.stderr.decode()}",
-            )],
-            isError=True,
+        logger.error(
+            "Git extract conflict files failed with return code %s:\n%s",
+            result.returncode,
+            result.stderr,
         )
+        return self._err("❌ Git extract conflict files failed:", result.stderr)
 
     async def _handle_git_remerge_from_files(self, args: Dict[str, Any]) -> CallToolResult:
         """Re-merge using edited files via git-resolve-conflict --tool-remerge."""
@@ -729,19 +1558,13 @@ class GitScriptsMCP:
         theirs_path = args.get("theirs_path")
 
         if not all([file, ours_path, base_path, theirs_path]):
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text="❌ Error: file, ours_path, base_path, and theirs_path are all required",
-                )],
-                isError=True,
-            )
+            return self._err("❌ Error: file, ours_path, base_path, and theirs_path are all required")
 
         script_path = self._get_script_path("git-resolve-conflict")
         cmd = [str(script_path), "--tool-remerge", file, ours_path, base_path, theirs_path]
 
         result = await self._run_command(cmd)
-        raw_stdout = result.stdout.decode().strip()
+        raw_stdout = result.stdout.strip()
         parsed = None
         if raw_stdout:
             try:
@@ -754,33 +1577,45 @@ class GitScriptsMCP:
                 message = parsed.get("message", raw_stdout)
             else:
                 message = raw_stdout
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=f"🔧 Re-merge completed successfully:\n\n{message}",
-                )],
-            )
+            return self._ok("🔧 Re-merge completed successfully:", message)
 
         if parsed and isinstance(parsed, dict):
             message = parsed.get("message", raw_stdout or "Re-merge failed")
-            return CallToolResult(
-                content=[TextContent(
-                    type="text",
-                    text=f"❌ Git remerge from files failed:\n{message}\n",
-                )],
-                isError=True,
-            )
+            return self._err("❌ Git remerge from files failed:", f"{message}\n")
 
-        error_output = result.stderr.decode().strip()
+        error_output = result.stderr.strip()
         if not error_output:
             error_output = raw_stdout
 
+        return self._err("❌ Git remerge from files failed:", f"{error_output}\n")
+
+    async def _handle_git_batch(self, args: Dict[str, Any]) -> CallToolResult:
+        """Run several read-only tools concurrently and merge their results."""
+        calls = args.get("calls") or []
+        if not calls:
+            return self._err("❌ Error: calls parameter is required")
+
+        rejected = [call.get("name") for call in calls if call.get("name") not in READ_ONLY_TOOLS]
+        if rejected:
+            return self._err(
+                f"❌ Error: git_batch only runs read-only tools "
+                f"({', '.join(sorted(READ_ONLY_TOOLS))}); got {rejected}",
+            )
+
+        # call_tool already turns handler exceptions into error results
+        results = await asyncio.gather(*(
+            self.call_tool(call["name"], call.get("arguments") or {})
+            for call in calls
+        ))
+
+        content: List[TextContent] = []
+        for call, result in zip(calls, results):
+            content.append(TextContent(type="text", text=f"=== {call['name']} ==="))
+            content.extend(result.content)
+
         return CallToolResult(
-            content=[TextContent(
-                type="text",
-                text=f"❌ Git remerge from files failed:\n{error_output}\n",
-            )],
-            isError=True,
+            content=content,
+            isError=any(result.isError for result in results),
         )
 
 
@@ -791,25 +1626,49 @@ async def main():
     # Check if git-scripts are available
     try:
         git_scripts._get_script_path("git-undo")
-        logger.info(f"Git scripts found in: {SCRIPT_DIR}")
+        logger.info("Git scripts found in: %s", SCRIPT_DIR)
     except FileNotFoundError:
         logger.error("Git scripts not found in: %s", SCRIPT_DIR)
         logger.error("Please ensure git scripts are installed and accessible")
         sys.exit(1)
 
-    async with stdio_server() as (read_stream, write_stream):
-        logger.info("🚀 Git Scripts MCP Server starting...")
-        await git_scripts.server.run(
-            read_stream,
-            write_stream,
-            git_scripts.server.create_initialization_options(),
-        )
+    # On the default event loop, children are started with close_fds=False and
+    # absolute executable paths so CPython can use posix_spawn() (except those
+    # needing a session of their own); make a fallback to fork+exec visible.
+    # uvloop spawns through libuv, where none of this applies.
+    if isinstance(asyncio.get_running_loop(), asyncio.BaseEventLoop):
+        if getattr(subprocess, "_USE_POSIX_SPAWN", False) and os.path.dirname(GIT):
+            logger.info("Spawning commands with posix_spawn() where possible")
+        else:
+            logger.warning("posix_spawn() unavailable; commands will use fork+exec")
 
+    await git_scripts.warm_up()
+    reaper = asyncio.create_task(git_scripts.reap_idle_workers())
 
-if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            logger.info("🚀 Git Scripts MCP Server starting...")
+            await git_scripts.server.run(
+                read_stream,
+                write_stream,
+                git_scripts.server.create_initialization_options(),
+            )
+    finally:
+        reaper.cancel()
+        await git_scripts.close()
 
 
 def main_sync():
     """Synchronous entry point for poetry scripts."""
+    try:
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        # libuv event loop: cheaper subprocess spawns and pipe I/O per tool call
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
+
+
+if __name__ == "__main__":
+    main_sync()
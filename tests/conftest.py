@@ -0,0 +1,62 @@
+"""Shared setup for the MCP server tests."""
+
+import sys
+import types
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp-server"))
+
+# Minimal stubs so server module can import without the external mcp package.
+mcp_module = types.ModuleType("mcp")
+mcp_server_module = types.ModuleType("mcp.server")
+mcp_stdio_module = types.ModuleType("mcp.server.stdio")
+mcp_types_module = types.ModuleType("mcp.types")
+
+
+class StubServer:
+    def __init__(self, _name):
+        pass
+
+    def list_tools(self):
+        def decorator(fn):
+            return fn
+        return decorator
+
+    def call_tool(self):
+        def decorator(fn):
+            return fn
+        return decorator
+
+
+async def stub_stdio_server():
+    raise RuntimeError("not used in tests")
+
+
+class StubCallToolResult:
+    def __init__(self, content, isError=False):
+        self.content = content
+        self.isError = isError
+
+
+class StubTextContent:
+    def __init__(self, type, text):
+        self.type = type
+        self.text = text
+
+
+class StubTool:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+mcp_server_module.Server = StubServer
+mcp_stdio_module.stdio_server = stub_stdio_server
+mcp_types_module.CallToolResult = StubCallToolResult
+mcp_types_module.TextContent = StubTextContent
+mcp_types_module.Tool = StubTool
+
+sys.modules.setdefault("mcp", mcp_module)
+sys.modules.setdefault("mcp.server", mcp_server_module)
+sys.modules.setdefault("mcp.server.stdio", mcp_stdio_module)
+sys.modules.setdefault("mcp.types", mcp_types_module)
@@ -1,80 +1,19 @@
 """Regression tests for MCP remerge error reporting."""
 
 import asyncio
-import subprocess
-import sys
-import types
 from pathlib import Path
 
-
-sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp-server"))
-
-# Minimal stubs so server module can import without the external mcp package.
-mcp_module = types.ModuleType("mcp")
-mcp_server_module = types.ModuleType("mcp.server")
-mcp_stdio_module = types.ModuleType("mcp.server.stdio")
-mcp_types_module = types.ModuleType("mcp.types")
-
-
-class StubServer:
-    def __init__(self, _name):
-        pass
-
-    def list_tools(self):
-        def decorator(fn):
-            return fn
-        return decorator
-
-    def call_tool(self):
-        def decorator(fn):
-            return fn
-        return decorator
-
-
-async def stub_stdio_server():
-    raise RuntimeError("not used in tests")
-
-
-class StubCallToolResult:
-    def __init__(self, content, isError=False):
-        self.content = content
-        self.isError = isError
-
-
-class StubTextContent:
-    def __init__(self, type, text):
-        self.type = type
-        self.text = text
-
-
-class StubTool:
-    def __init__(self, **kwargs):
-        self.kwargs = kwargs
-
-
-mcp_server_module.Server = StubServer
-mcp_stdio_module.stdio_server = stub_stdio_server
-mcp_types_module.CallToolResult = StubCallToolResult
-mcp_types_module.TextContent = StubTextContent
-mcp_types_module.Tool = StubTool
-
-sys.modules.setdefault("mcp", mcp_module)
-sys.modules.setdefault("mcp.server", mcp_server_module)
-sys.modules.setdefault("mcp.server.stdio", mcp_stdio_module)
-sys.modules.setdefault("mcp.types", mcp_types_module)
-
-from git_scripts_mcp.server import GitScriptsMCP
+from git_scripts_mcp.server import GitScriptsMCP, _CmdResult
 
 
 def test_remerge_handler_reports_stdout_when_stderr_empty(monkeypatch):
     server = GitScriptsMCP()
 
-    async def fake_run_command(cmd, input_text=None):
-        return subprocess.CompletedProcess(
-            args=cmd,
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
+        return _CmdResult(
             returncode=1,
-            stdout=b"Re-merge still has conflicts after manual edits for f.txt.\n",
-            stderr=b"",
+            stdout="Re-merge still has conflicts after manual edits for f.txt.\n",
+            stderr="",
         )
 
     monkeypatch.setattr(server, "_run_command", fake_run_command)
@@ -99,13 +38,12 @@ def test_remerge_handler_parses_json_still_conflicted_payload(monkeypatch):
     server = GitScriptsMCP()
     captured_cmd = {}
 
-    async def fake_run_command(cmd, input_text=None):
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
         captured_cmd["cmd"] = cmd
-        return subprocess.CompletedProcess(
-            args=cmd,
+        return _CmdResult(
             returncode=1,
-            stdout=b'{"status":"still_conflicted","message":"still conflicted"}\n',
-            stderr=b"",
+            stdout='{"status":"still_conflicted","message":"still conflicted"}\n',
+            stderr="",
         )
 
     monkeypatch.setattr(server, "_run_command", fake_run_command)
@@ -131,15 +69,15 @@ def test_find_file_handler_passes_history_and_deleted_flags(monkeypatch):
     server = GitScriptsMCP()
     captured_cmd = {}
 
-    async def fake_run_command(cmd, input_text=None):
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
         captured_cmd["cmd"] = cmd
-        return subprocess.CompletedProcess(args=cmd, returncode=0, stdout=b"ok\n", stderr=b"")
+        return _CmdResult(returncode=0, stdout="ok\n", stderr="")
 
     monkeypatch.setattr(server, "_run_command", fake_run_command)
     monkeypatch.setattr(server, "_get_script_path", lambda _: Path("/tmp/git-find_file"))
 
     result = asyncio.run(
-        server._handle_git_find_file(
+        server.handlers["git_find_file"](
             {"pattern": "foo", "local": True, "history": True, "deleted": True}
         )
     )
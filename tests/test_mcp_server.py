@@ -0,0 +1,568 @@
+"""Tests for the MCP server: tool dispatch, caching, subprocesses and in-process git."""
+
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from git_scripts_mcp import server as git_scripts_server
+from git_scripts_mcp.server import GitScriptsMCP, _CmdResult
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def run(cmd, cwd, check=True, env=None):
+    result = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, env=env)
+    if check and result.returncode != 0:
+        raise AssertionError(
+            f"Command failed ({result.returncode}): {' '.join(cmd)}\n"
+            f"stdout:\n{result.stdout}\n"
+            f"stderr:\n{result.stderr}"
+        )
+    return result
+
+
+def init_repo(tmp_path: Path) -> Path:
+    """Repository on main with a single commit adding f.txt."""
+    repo = tmp_path / "repo"
+    repo.mkdir()
+
+    run(["git", "init", "-q", "-b", "main"], cwd=repo)
+    run(["git", "config", "user.name", "Test User"], cwd=repo)
+    run(["git", "config", "user.email", "test@example.com"], cwd=repo)
+
+    (repo / "f.txt").write_text("one\ntwo\n", encoding="utf-8")
+    run(["git", "add", "f.txt"], cwd=repo)
+    run(["git", "commit", "-qm", "base"], cwd=repo)
+
+    return repo
+
+
+def init_cherry_picked_repo(tmp_path: Path) -> Path:
+    """main and topic diverge; main cherry-picks topic's first commit."""
+    repo = init_repo(tmp_path)
+
+    run(["git", "checkout", "-qb", "topic"], cwd=repo)
+    (repo / "f.txt").write_text("one\n2\n", encoding="utf-8")
+    run(["git", "commit", "-q", "-am", "change f", "-m", "with a body"], cwd=repo)
+    (repo / "g.txt").write_text("g\n", encoding="utf-8")
+    run(["git", "add", "g.txt"], cwd=repo)
+    run(["git", "commit", "-qm", "add g"], cwd=repo)
+
+    run(["git", "checkout", "-q", "main"], cwd=repo)
+    (repo / "h.txt").write_text("h\n", encoding="utf-8")
+    run(["git", "add", "h.txt"], cwd=repo)
+    run(["git", "commit", "-qm", "add h"], cwd=repo)
+    run(["git", "cherry-pick", "topic~1"], cwd=repo)
+
+    return repo
+
+
+def test_branch_diff_handler_bounds_each_side_log(monkeypatch):
+    server = GitScriptsMCP()
+    calls = []
+    logs = {
+        "main..topic": "aaa111 local work\nccc333 more local\n",
+        "topic..main": "bbb222 upstream fix\n",
+    }
+
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
+        calls.append(cmd)
+        return _CmdResult(returncode=0, stdout=logs[cmd[-2]], stderr="")
+
+    async def no_repo(func, *args):
+        return None
+
+    monkeypatch.setattr(server, "_run_command", fake_run_command)
+    monkeypatch.setattr(server, "_in_repo", no_repo)
+
+    result = asyncio.run(
+        server._handle_git_branch_diff({"branch1": "topic", "branch2": "main"})
+    )
+
+    assert len(calls) == 2
+    assert all("--max-count=20" in cmd for cmd in calls)
+    assert result.isError is False
+    text = result.content[0].text
+    assert "=== topic commits ===\naaa111 local work\nccc333 more local\n" in text
+    assert "=== main commits ===\nbbb222 upstream fix\n" in text
+
+
+def test_list_tools_reuses_prebuilt_definitions():
+    server = GitScriptsMCP()
+
+    first = asyncio.run(server.list_tools())
+    second = asyncio.run(server.list_tools())
+
+    assert first is second
+    assert "git_undo" in [tool.kwargs["name"] for tool in first]
+
+
+def test_batch_handler_rejects_mutating_tools():
+    server = GitScriptsMCP()
+
+    result = asyncio.run(
+        server._handle_git_batch({"calls": [{"name": "git_undo", "arguments": {}}]})
+    )
+
+    assert result.isError is True
+    assert "read-only" in result.content[0].text
+
+
+def test_batch_handler_runs_calls_and_keeps_order(monkeypatch):
+    server = GitScriptsMCP()
+
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
+        return _CmdResult(returncode=0, stdout="found\n", stderr="")
+
+    monkeypatch.setattr(server, "_run_command", fake_run_command)
+    monkeypatch.setattr(server, "_get_script_path", lambda name: Path("/tmp") / name)
+
+    result = asyncio.run(
+        server._handle_git_batch({
+            "calls": [
+                {"name": "git_find_file", "arguments": {"pattern": "foo"}},
+                {"name": "git_check_dup", "arguments": {}},
+            ]
+        })
+    )
+
+    texts = [item.text for item in result.content]
+    assert result.isError is False
+    assert texts[0] == "=== git_find_file ==="
+    assert "found" in texts[1]
+    assert texts[2] == "=== git_check_dup ==="
+
+
+def test_script_tool_maps_flags_and_confirmation(monkeypatch):
+    server = GitScriptsMCP()
+    captured = {}
+
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
+        captured["cmd"] = cmd
+        captured["input_bytes"] = input_bytes
+        return _CmdResult(returncode=0, stdout="redone\n", stderr="")
+
+    monkeypatch.setattr(server, "_run_command", fake_run_command)
+    monkeypatch.setattr(server, "_get_script_path", lambda name: Path("/tmp") / name)
+
+    result = asyncio.run(
+        server.call_tool("git_redo", {"message_only": True, "confirm": True})
+    )
+
+    assert captured["cmd"] == ["/tmp/git-redo", "--message-only"]
+    assert captured["input_bytes"] == b"y\n"
+    assert result.isError is False
+    assert result.content[0].text == "✅ Git redo completed successfully:\n\nredone\n"
+
+
+def test_check_dup_reuses_output_while_tips_unchanged(monkeypatch):
+    server = GitScriptsMCP()
+    runs = []
+    tips = {"HEAD": "a" * 40, "origin/main": "b" * 40}
+
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
+        runs.append(cmd)
+        return _CmdResult(returncode=0, stdout="dup\n", stderr="")
+
+    async def fake_resolve_commit(rev):
+        return tips[rev]
+
+    async def no_repo(func, *args):
+        return None
+
+    monkeypatch.setattr(server, "_in_repo", no_repo)
+    monkeypatch.setattr(server, "_run_command", fake_run_command)
+    monkeypatch.setattr(server, "_resolve_commit", fake_resolve_commit)
+    monkeypatch.setattr(server, "_get_script_path", lambda name: Path("/tmp") / name)
+
+    first = asyncio.run(server._handle_git_check_dup({}))
+    second = asyncio.run(server._handle_git_check_dup({}))
+    tips["HEAD"] = "c" * 40
+    asyncio.run(server._handle_git_check_dup({}))
+
+    assert first.content[0].text == second.content[0].text
+    assert len(runs) == 2
+
+
+def test_read_only_results_reused_until_mutating_tool_runs(monkeypatch):
+    server = GitScriptsMCP()
+    runs = []
+
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
+        runs.append(cmd)
+        return _CmdResult(returncode=0, stdout="ok\n", stderr="")
+
+    async def fake_resolve_commit(rev):
+        return "a" * 40
+
+    monkeypatch.setattr(server, "_run_command", fake_run_command)
+    monkeypatch.setattr(server, "_resolve_commit", fake_resolve_commit)
+    monkeypatch.setattr(server, "_get_script_path", lambda name: Path("/tmp") / name)
+
+    async def scenario():
+        await server.call_tool("git_find_file", {"pattern": "foo"})
+        await server.call_tool("git_find_file", {"pattern": "foo"})
+        await server.call_tool("git_undo", {})
+        await server.call_tool("git_find_file", {"pattern": "foo"})
+
+    asyncio.run(scenario())
+
+    assert [cmd[0] for cmd in runs] == [
+        "/tmp/git-find_file",
+        "/tmp/git-undo",
+        "/tmp/git-find_file",
+    ]
+
+
+def test_identical_reads_share_one_run_and_writes_wait(monkeypatch):
+    server = GitScriptsMCP()
+    events = []
+
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
+        events.append(("start", cmd[0]))
+        await asyncio.sleep(0.01)
+        events.append(("end", cmd[0]))
+        return _CmdResult(returncode=0, stdout="ok\n", stderr="")
+
+    async def fake_resolve_commit(rev):
+        return "a" * 40
+
+    monkeypatch.setattr(server, "_run_command", fake_run_command)
+    monkeypatch.setattr(server, "_resolve_commit", fake_resolve_commit)
+    monkeypatch.setattr(server, "_get_script_path", lambda name: Path("/tmp") / name)
+
+    async def scenario():
+        return await asyncio.gather(
+            server.call_tool("git_find_file", {"pattern": "foo"}),
+            server.call_tool("git_find_file", {"pattern": "foo"}),
+            server.call_tool("git_undo", {}),
+        )
+
+    first, second, _ = asyncio.run(scenario())
+
+    assert first.content[0].text == second.content[0].text
+    assert events == [
+        ("start", "/tmp/git-find_file"),
+        ("end", "/tmp/git-find_file"),
+        ("start", "/tmp/git-undo"),
+        ("end", "/tmp/git-undo"),
+    ]
+
+
+def test_oversized_output_keeps_head_and_tail(monkeypatch):
+    server = GitScriptsMCP()
+    monkeypatch.setattr(git_scripts_server, "OUTPUT_CLIP_CHARS", 4)
+
+    result = server._ok("title", "0123456789abcdef")
+
+    text = result.content[0].text
+    assert text.startswith("title\n\n0123")
+    assert text.endswith("cdef")
+    assert "[8 characters truncated]" in text
+    assert server._ok("title", "01234567").content[0].text == "title\n\n01234567"
+
+
+def test_find_file_requires_pattern(monkeypatch):
+    server = GitScriptsMCP()
+    monkeypatch.setattr(server, "_get_script_path", lambda _: Path("/tmp/git-find_file"))
+
+    result = asyncio.run(server.handlers["git_find_file"]({"local": True}))
+
+    assert result.isError is True
+    assert result.content[0].text == "❌ Error: pattern parameter is required"
+
+
+def test_run_command_stops_output_past_max_bytes():
+    server = GitScriptsMCP()
+    cmd = [sys.executable, "-c", "import sys\nwhile True: sys.stdout.write('x' * 4096)"]
+
+    result = asyncio.run(server._run_command(cmd, max_bytes=10))
+
+    assert result.returncode == 0
+    assert result.stdout == "x" * 10 + "\n... [output truncated after 10 bytes] ...\n"
+
+
+def test_check_dup_in_process_matches_script(tmp_path):
+    pygit2 = pytest.importorskip("pygit2")
+    repo = init_cherry_picked_repo(tmp_path)
+
+    for quiet in (True, False):
+        report = git_scripts_server._check_dup_report(
+            pygit2.Repository(str(repo)),
+            git_scripts_server._PatchIdStore(),
+            "topic",
+            quiet,
+        )
+        expected = run(
+            [str(REPO_ROOT / "git-check-dup"), *(["--quiet"] if quiet else []), "topic"],
+            cwd=repo,
+        ).stdout
+        assert report == expected
+        assert report
+
+    # An empty file added on both sides: 'git show' prints no hunk for it, so
+    # the report is left to the script
+    run(["git", "checkout", "-q", "topic"], cwd=repo)
+    (repo / "empty.py").write_text("", encoding="utf-8")
+    run(["git", "add", "empty.py"], cwd=repo)
+    run(["git", "commit", "-qm", "add empty.py"], cwd=repo)
+    run(["git", "checkout", "-q", "main"], cwd=repo)
+    run(["git", "cherry-pick", "topic"], cwd=repo)
+    report = git_scripts_server._check_dup_report(
+        pygit2.Repository(str(repo)), git_scripts_server._PatchIdStore(), "topic", False,
+    )
+    assert report is None
+
+
+def test_idle_cat_file_workers_are_stopped(tmp_path, monkeypatch):
+    repo = init_cherry_picked_repo(tmp_path)
+    monkeypatch.setattr(git_scripts_server, "_GIT_WORKERS", {})
+    monkeypatch.chdir(repo)
+
+    async def scenario():
+        worker = git_scripts_server._git_worker()
+        head = await worker.check("HEAD")
+        process = worker._process
+
+        loop = asyncio.get_running_loop()
+        await git_scripts_server._close_idle_workers(loop.time())
+        assert process.returncode is None
+
+        # A request in flight keeps its child even once the worker looks idle
+        worker.last_used -= git_scripts_server.IDLE_TIMEOUT + 1
+        async with worker._lock:
+            await git_scripts_server._close_idle_workers(loop.time())
+            assert process.returncode is None
+
+        await git_scripts_server._close_idle_workers(loop.time())
+        assert process.returncode is not None
+
+        try:
+            assert await worker.check("HEAD") == head
+        finally:
+            await worker.close()
+
+    asyncio.run(scenario())
+
+    assert list(git_scripts_server._GIT_WORKERS) == [str(repo)]
+
+
+def test_diff_patch_in_process_matches_script(tmp_path, monkeypatch):
+    pytest.importorskip("pygit2")
+    repo = init_cherry_picked_repo(tmp_path)
+    run(["git", "checkout", "-q", "topic"], cwd=repo)
+    run(["git", "mv", "f.txt", "renamed.txt"], cwd=repo)
+    run(["git", "commit", "-qm", "rename"], cwd=repo)
+    # Empty files added or deleted have no hunks for libgit2 to hash
+    (repo / "empty.py").write_text("", encoding="utf-8")
+    run(["git", "add", "empty.py"], cwd=repo)
+    run(["git", "commit", "-qm", "add empty.py"], cwd=repo)
+    run(["git", "rm", "-q", "empty.py"], cwd=repo)
+    run(["git", "commit", "-qm", "delete empty.py"], cwd=repo)
+    run(["git", "checkout", "-q", "--orphan", "root"], cwd=repo)
+    run(["git", "rm", "-rqf", "."], cwd=repo)
+    (repo / "empty.py").write_text("", encoding="utf-8")
+    run(["git", "add", "empty.py"], cwd=repo)
+    run(["git", "commit", "-qm", "root with empty.py"], cwd=repo)
+    run(["git", "checkout", "-q", "main"], cwd=repo)
+
+    monkeypatch.setattr(git_scripts_server, "_GIT_WORKERS", {})
+    monkeypatch.chdir(repo)
+    server = GitScriptsMCP()
+
+    async def compare(commit1, commit2):
+        try:
+            return await server._handle_git_diff_patch({"commit1": commit1, "commit2": commit2})
+        finally:
+            await server.close()
+
+    # The rename and empty-file commits can't be hashed like 'git show' prints
+    # them and go to the script
+    for commits, verdict in (
+        (("main", "topic~4"), "✅ Patches are identical"),
+        (("main", "topic~2"), "❌ Patches differ"),
+        (("topic~1", "topic"), "❌ Patches differ"),
+        (("root", "topic~1"), "✅ Patches are identical"),
+    ):
+        result = asyncio.run(compare(*commits))
+        expected = run([str(REPO_ROOT / "git-diff-patch"), *commits], cwd=repo).stdout
+        assert result.content[0].text == "✅ Patch comparison results:\n\n" + expected
+        assert verdict in expected
+
+
+def test_diff_patch_falls_back_when_second_lookup_fails(monkeypatch):
+    server = GitScriptsMCP()
+    runs = []
+
+    async def fake_run_command(cmd, input_bytes=None, **kwargs):
+        runs.append(cmd)
+        return _CmdResult(returncode=0, stdout="❌ Patches differ\n", stderr="")
+
+    async def flaky_resolve_commit(rev):
+        if rev == "b":
+            raise OSError("cat-file went away")
+        return "a" * 40
+
+    monkeypatch.setattr(server, "_run_command", fake_run_command)
+    monkeypatch.setattr(server, "_resolve_commit", flaky_resolve_commit)
+    monkeypatch.setattr(server, "_get_script_path", lambda name: Path("/tmp") / name)
+
+    result = asyncio.run(server._handle_git_diff_patch({"commit1": "a", "commit2": "b"}))
+
+    assert result.content[0].text == "✅ Patch comparison results:\n\n❌ Patches differ\n"
+    assert runs == [[str(Path("/tmp") / "git-diff-patch"), "a", "b"]]
+
+
+def _process_running(pid):
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except FileNotFoundError:
+        return False
+    return stat.rsplit(")", 1)[1].split()[0] != "Z"
+
+
+def test_cancelled_read_only_command_stops_its_children(tmp_path):
+    if not Path("/proc/self/stat").exists():
+        pytest.skip("needs /proc")
+    server = GitScriptsMCP()
+    pid_file = tmp_path / "pid"
+    cmd = ["sh", "-c", f"sleep 30 & echo $! > {pid_file}; wait"]
+
+    async def scenario():
+        task = asyncio.ensure_future(server._run_command(cmd, terminate_on_cancel=True))
+        while not pid_file.exists() or not pid_file.read_text().strip():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+    assert not _process_running(int(pid_file.read_text()))
+
+
+def test_cancelled_mutating_command_runs_to_completion(tmp_path):
+    server = GitScriptsMCP()
+    done = tmp_path / "done"
+    cmd = ["sh", "-c", f"sleep 0.3; touch {done}"]
+
+    async def scenario():
+        task = asyncio.ensure_future(server._run_command(cmd))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return done.exists()
+
+    assert asyncio.run(scenario())
+
+
+def test_cancelled_cat_file_lookup_does_not_shift_later_answers(tmp_path, monkeypatch):
+    repo = init_cherry_picked_repo(tmp_path)
+    monkeypatch.setattr(git_scripts_server, "_GIT_WORKERS", {})
+    monkeypatch.chdir(repo)
+
+    async def scenario():
+        worker = git_scripts_server._git_worker()
+        head = await worker.check("HEAD")
+        parent = await worker.check("HEAD~1^{commit}")
+
+        # Cancel once the request has been written and its reply is pending
+        task = asyncio.ensure_future(worker.check("HEAD~1^{commit}"))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        try:
+            return head, parent, await worker.check("HEAD")
+        finally:
+            await worker.close()
+
+    head, parent, after = asyncio.run(scenario())
+
+    assert head != parent
+    assert after == head
+
+
+def test_branch_logs_in_process_match_git_log(tmp_path):
+    pygit2 = pytest.importorskip("pygit2")
+    repo = init_repo(tmp_path)
+
+    # Same-second commits and a merge: the order comes from the graph, not the clock
+    base_time = "@" + run(["git", "log", "-1", "--format=%ct"], cwd=repo).stdout.strip()
+    same_second = dict(os.environ, GIT_AUTHOR_DATE=base_time, GIT_COMMITTER_DATE=base_time)
+
+    run(["git", "checkout", "-qb", "topic"], cwd=repo)
+    run(
+        ["git", "commit", "-q", "--allow-empty", "-m", "subject that\nwraps onto two lines\n\nbody"],
+        cwd=repo, env=same_second,
+    )
+    run(["git", "checkout", "-qb", "side"], cwd=repo)
+    for i in range(3):
+        run(["git", "commit", "-q", "--allow-empty", "-m", f"side {i}"], cwd=repo, env=same_second)
+    run(["git", "checkout", "-q", "topic"], cwd=repo)
+    for i in range(25):
+        run(["git", "commit", "-q", "--allow-empty", "-m", f"topic {i}"], cwd=repo, env=same_second)
+    run(["git", "merge", "-q", "--no-ff", "--no-edit", "side"], cwd=repo, env=same_second)
+
+    run(["git", "checkout", "-q", "main"], cwd=repo)
+    run(["git", "commit", "-q", "--allow-empty", "-m", "upstream"], cwd=repo)
+
+    for abbrev in ("auto", "11"):
+        run(["git", "config", "core.abbrev", abbrev], cwd=repo)
+        logs = git_scripts_server._branch_logs(pygit2.Repository(str(repo)), "topic", "main")
+        for side, revs in zip(logs, ("main..topic", "topic..main")):
+            expected = run(["git", "log", "--oneline", "--max-count=20", revs], cwd=repo).stdout
+            assert "".join(side) == expected
+
+
+def test_run_command_max_bytes_stops_pipeline_children():
+    server = GitScriptsMCP()
+    cmd = ["sh", "-c", "yes | cat"]
+
+    result = asyncio.run(asyncio.wait_for(server._run_command(cmd, max_bytes=10), 5))
+
+    assert result.returncode == 0
+    assert result.stdout == "y\ny\ny\ny\ny\n\n... [output truncated after 10 bytes] ...\n"
+
+
+def test_patch_id_store_skips_torn_lines(tmp_path):
+    oid, patch_id = "a" * 40, "b" * 40
+    path = tmp_path / "cache"
+    path.write_text(
+        f"{git_scripts_server.PATCH_ID_CACHE_HEADER}{oid} {patch_id}\n{'c' * 40} -\n{'d' * 40} \n{'e' * 40}\n{'f' * 40} {patch_id[:10]}\n",
+        encoding="ascii",
+    )
+    store = git_scripts_server._PatchIdStore()
+    store.load(path)
+
+    assert store._ids == {oid: patch_id, "c" * 40: ""}
+
+
+def test_patch_id_store_discards_unversioned_files(tmp_path):
+    pygit2 = pytest.importorskip("pygit2")
+    repo = init_repo(tmp_path)
+    head = run(["git", "rev-parse", "HEAD"], cwd=repo).stdout.strip()
+    path = tmp_path / "cache"
+    # Written before the header existed, possibly with a since-fixed patch-id
+    path.write_text(f"{head} {'b' * 40}\n", encoding="ascii")
+
+    store = git_scripts_server._PatchIdStore()
+    store.load(path)
+    patch_id = store.lookup(pygit2.Repository(str(repo)), head)
+    store.flush()
+
+    assert patch_id == git_scripts_server._patch_id(pygit2.Repository(str(repo)), head)
+    assert path.read_text(encoding="ascii") == (
+        f"{git_scripts_server.PATCH_ID_CACHE_HEADER}{head} {patch_id}\n"
+    )
+
+    reloaded = git_scripts_server._PatchIdStore()
+    reloaded.load(path)
+    assert reloaded._ids == {head: patch_id}